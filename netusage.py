@@ -22,6 +22,7 @@ Yeni özellikler
 Kullanım
   python3 netusage.py watch --interval 60
   python3 netusage.py sample
+  python3 netusage.py import eski_ornekler.csv
   python3 netusage.py report --day 2025-11-02
   python3 netusage.py report --day 2025-11-02 --hourly
   python3 netusage.py report --from "2025-11-01T00:00:00" --to "2025-11-02T00:00:00"
@@ -35,42 +36,146 @@ Notlar
 """
 
 import argparse
+import atexit
+import ctypes
+import ctypes.util
+import csv
 import datetime as dt
+import functools
 import os
+import pathlib
+import re
 import signal
+import socket
 import sqlite3
+import struct
 import subprocess
 import sys
+import threading
 import time
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Union
 
-DB_PATH_DEFAULT = os.path.expanduser("~/.netusage.db")
+DB_PATH_DEFAULT = pathlib.Path.home() / ".netusage.db"
+IFACE_CACHE_PATH = pathlib.Path.home() / ".netusage.iface"
+IFACE_CACHE_TTL = 3600
+# Şema bu süreçte zaten oluşturulmuş veritabanı yolları
+_INITIALIZED_DBS: set[str] = set()
+# İş parçacığı başına, veritabanı yolu -> açık bağlantı
+_conns = threading.local()
+# [sample] satırlarındaki zaman damgası (datetime.isoformat() ile aynı görünüm)
+LOG_TS_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+# `route get default` çıktısındaki "interface: en0" satırı
+_IFACE_RE = re.compile(r"^\s*interface:\s*(\S+)", re.M)
+# `networksetup -listallhardwareports`: Wi-Fi (normal veya bölünmez tire) portunun cihazı
+_WIFI_RE = re.compile(r"Hardware Port: Wi[-\u2011]Fi\s*\nDevice:\s*(\S+)")
 
 def run(cmd: list[str]) -> str:
     out = subprocess.check_output(cmd, text=True)
     return out.strip()
 
+@functools.lru_cache(maxsize=1)
 def detect_default_iface() -> Optional[str]:
+    # Ardışık report çağrıları route/networksetup'ı yeniden çalıştırmasın diye dosyada önbellek
     try:
-        out = run(["route", "get", "default"])
-        for line in out.splitlines():
-            if "interface:" in line:
-                return line.split()[-1].strip()
+        if time.time() - os.stat(IFACE_CACHE_PATH).st_mtime < IFACE_CACHE_TTL:
+            with open(IFACE_CACHE_PATH) as f:
+                cached = f.read().strip()
+            if cached:
+                return cached
+    except OSError:
+        pass
+    iface = _detect_default_iface_uncached()
+    if iface:
+        try:
+            with open(IFACE_CACHE_PATH, "w") as f:
+                f.write(iface + "\n")
+        except OSError:
+            pass
+    return iface or "en0"
+
+def _detect_default_iface_uncached() -> Optional[str]:
+    try:
+        m = _IFACE_RE.search(run(["route", "get", "default"]))
+        if m:
+            return m.group(1)
     except Exception:
         pass
     try:
-        out = run(["networksetup", "-listallhardwareports"])
-        lines = out.splitlines()
-        for i, line in enumerate(lines):
-            if "Hardware Port: Wi-Fi" in line or "Hardware Port: Wi‑Fi" in line:
-                for j in range(i+1, min(i+5, len(lines))):
-                    if lines[j].strip().startswith("Device:"):
-                        return lines[j].split(":")[1].strip()
+        m = _WIFI_RE.search(run(["networksetup", "-listallhardwareports"]))
+        if m:
+            return m.group(1)
     except Exception:
         pass
-    return "en0"
+    return None
+
+# macOS sysctl sabitleri (<sys/socket.h>, <net/route.h>)
+CTL_NET = 4
+PF_ROUTE = 17
+NET_RT_IFLIST2 = 6
+RTM_IFINFO2 = 0x12
+# if_msghdr2 içinde: ifm_index ofseti ve if_data64.ifi_ibytes / ifi_obytes ofseti
+_IFM_INDEX_OFF = 12
+_IFM_IBYTES_OFF = 32 + 64
+
+_libc = None
+
+def _read_iface_bytes_native(iface: str) -> Tuple[int, int]:
+    # getifaddrs() macOS'ta 32-bit if_data döndürür (4 GB'de taşar); NET_RT_IFLIST2
+    # ise if_data64 içeren if_msghdr2 kayıtları verir
+    global _libc
+    if sys.platform != "darwin":
+        raise OSError("yalnızca macOS")
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    index = socket.if_nametoindex(iface)
+    mib = (ctypes.c_int * 6)(CTL_NET, PF_ROUTE, 0, 0, NET_RT_IFLIST2, 0)
+    size = ctypes.c_size_t(0)
+    if _libc.sysctl(mib, 6, None, ctypes.byref(size), None, ctypes.c_size_t(0)) != 0:
+        raise OSError(ctypes.get_errno(), "sysctl")
+    # İki çağrı arasında arayüz eklenirse ENOMEM olmasın diye biraz pay bırakılır
+    size.value += 1024
+    buf = ctypes.create_string_buffer(size.value)
+    if _libc.sysctl(mib, 6, buf, ctypes.byref(size), None, ctypes.c_size_t(0)) != 0:
+        raise OSError(ctypes.get_errno(), "sysctl")
+    data = buf.raw[:size.value]
+    off = 0
+    while off < len(data):
+        msglen, _, msgtype = struct.unpack_from("=HBB", data, off)
+        if msglen == 0:
+            break
+        if msgtype == RTM_IFINFO2:
+            (idx,) = struct.unpack_from("=H", data, off + _IFM_INDEX_OFF)
+            if idx == index:
+                rx, tx = struct.unpack_from("=QQ", data, off + _IFM_IBYTES_OFF)
+                return rx, tx
+        off += msglen
+    raise LookupError(f"arayüz bulunamadı: {iface}")
 
 def read_iface_bytes(iface: str) -> Tuple[int, int]:
+    try:
+        return _read_iface_bytes_native(iface)
+    except Exception:
+        return _read_iface_bytes_netstat(iface)
+
+@functools.lru_cache(maxsize=8)
+def _resolve_columns(header: str) -> Tuple[int, int]:
+    # Başlık satırı watch boyunca değişmez; sütun indeksleri başlık metnine göre önbelleklenir
+    cols = header.split()
+    def find_idx(name: str) -> Optional[int]:
+        for idx, c in enumerate(cols):
+            if c.lower() == name:
+                return idx
+        return None
+    try:
+        i_idx = find_idx("ibytes") or cols.index("Ibytes")
+        o_idx = find_idx("obytes") or cols.index("Obytes")
+    except Exception:
+        i_idx = -4
+        o_idx = -3
+    return i_idx, o_idx
+
+def _read_iface_bytes_netstat(iface: str) -> Tuple[int, int]:
     out = run(["netstat", "-ib", "-I", iface])
     lines = [l for l in out.splitlines() if l.strip()]
     header = None
@@ -91,18 +196,7 @@ def read_iface_bytes(iface: str) -> Tuple[int, int]:
             except Exception:
                 continue
         return rx_total, tx_total
-    cols = header.split()
-    def find_idx(name: str) -> Optional[int]:
-        for idx, c in enumerate(cols):
-            if c.lower() == name:
-                return idx
-        return None
-    try:
-        i_idx = find_idx("ibytes") or cols.index("Ibytes")
-        o_idx = find_idx("obytes") or cols.index("Obytes")
-    except Exception:
-        i_idx = -4
-        o_idx = -3
+    i_idx, o_idx = _resolve_columns(header)
     rx_total = 0
     tx_total = 0
     for l in data_lines:
@@ -118,66 +212,229 @@ def read_iface_bytes(iface: str) -> Tuple[int, int]:
             pass
     return rx_total, tx_total
 
-def ensure_db(db_path: str = DB_PATH_DEFAULT):
-    con = sqlite3.connect(db_path)
+DbPath = Union[str, pathlib.Path]
+
+def connect(db_path: DbPath) -> sqlite3.Connection:
+    # isolation_level=None: sürücü gizli BEGIN açmaz; işlemler BEGIN IMMEDIATE/COMMIT ile açıkça yönetilir
+    con = sqlite3.connect(db_path, isolation_level=None)
+    # Bağlantı başına ayarlar; journal_mode=WAL veritabanında kalıcıdır (ensure_db)
+    con.execute("PRAGMA synchronous=NORMAL")
+    con.execute("PRAGMA temp_store=MEMORY")
+    con.execute("PRAGMA cache_size=-20000")
+    con.execute("PRAGMA mmap_size=268435456")
+    return con
+
+def _get_conn(db_path: DbPath) -> sqlite3.Connection:
+    # Bağlantı açmak ücretsiz değil (sayfa önbelleği, PRAGMA'lar); süreç boyunca yeniden kullanılır
+    cache = getattr(_conns, "by_path", None)
+    if cache is None:
+        cache = _conns.by_path = {}
+        atexit.register(_close_conns, cache)
+    key = os.fspath(db_path)
+    con = cache.get(key)
+    if con is None:
+        con = cache[key] = connect(key)
+    return con
+
+def _close_conns(cache: dict[str, sqlite3.Connection]):
+    # Otomatik commit modunda meşru olarak bekleyen işlem kalmaz; yarım kalmış
+    # (ör. Ctrl-C ile kesilmiş) bir işlem varsa kaydedilmez, geri alınır
+    for con in cache.values():
+        try:
+            if con.in_transaction:
+                con.execute("ROLLBACK")
+            con.close()
+        except sqlite3.Error:
+            pass
+    cache.clear()
+
+def ensure_db(db_path: DbPath = DB_PATH_DEFAULT):
+    key = os.fspath(db_path)
+    if key in _INITIALIZED_DBS:
+        return
+    con = _get_conn(key)
     cur = con.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS samples (
-            ts INTEGER NOT NULL,
-            iface TEXT NOT NULL,
-            rx_bytes INTEGER NOT NULL,
-            tx_bytes INTEGER NOT NULL
-        );
-    """)
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_samples_ts_iface ON samples(ts, iface);")
-    con.commit()
-    con.close()
-
-def insert_sample(iface: str, db_path: str = DB_PATH_DEFAULT):
-    ensure_db(db_path)
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA wal_autocheckpoint=1000")
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        # rx_delta/tx_delta: bir önceki örneğe göre fark (negatifse 0); raporlar yalnızca bunları toplar
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS samples (
+                ts INTEGER NOT NULL,
+                iface TEXT NOT NULL,
+                rx_bytes INTEGER NOT NULL,
+                tx_bytes INTEGER NOT NULL,
+                rx_delta INTEGER NOT NULL DEFAULT 0,
+                tx_delta INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        cols = {row[1] for row in cur.execute("PRAGMA table_info(samples)")}
+        if "rx_delta" not in cols:
+            # Eski şema: delta sütunları eklenir ve mevcut örnekler için doldurulur
+            cur.execute("ALTER TABLE samples ADD COLUMN rx_delta INTEGER NOT NULL DEFAULT 0")
+            cur.execute("ALTER TABLE samples ADD COLUMN tx_delta INTEGER NOT NULL DEFAULT 0")
+            for (iface,) in cur.execute("SELECT DISTINCT iface FROM samples").fetchall():
+                _rebuild_deltas(con, iface, 0)
+        # (iface, ts) sırası WHERE iface = ? AND ts >= ? AND ts < ? sorgusuna uyar; sayaçlar ve
+        # deltalar da indekste olduğundan tabloya hiç dönülmez (covering index)
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_samples_iface_ts_deltas'")
+        created = cur.fetchone() is None
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_samples_iface_ts_deltas
+            ON samples(iface, ts, rx_bytes, tx_bytes, rx_delta, tx_delta);
+        """)
+        cur.execute("DROP INDEX IF EXISTS idx_samples_iface_ts;")
+        cur.execute("DROP INDEX IF EXISTS idx_samples_ts_iface;")
+        # Saatlik toplamlar: her örneğin deltası kendi saatine yazılır
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'usage_hourly'")
+        rollup_created = cur.fetchone() is None
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS usage_hourly (
+                iface TEXT NOT NULL,
+                hour_ts INTEGER NOT NULL,
+                rx INTEGER NOT NULL,
+                tx INTEGER NOT NULL,
+                PRIMARY KEY (iface, hour_ts)
+            );
+        """)
+        if rollup_created:
+            for (iface,) in cur.execute("SELECT DISTINCT iface FROM samples").fetchall():
+                _rebuild_rollup(con, iface, 0)
+        cur.execute("COMMIT")
+    finally:
+        if con.in_transaction:
+            cur.execute("ROLLBACK")
+    if created:
+        cur.execute("ANALYZE")
+    _INITIALIZED_DBS.add(key)
+
+def _read_and_row(iface: str) -> Tuple[int, str, int, int]:
     rx, tx = read_iface_bytes(iface)
-    ts = int(time.time())
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
-    cur.execute("INSERT INTO samples (ts, iface, rx_bytes, tx_bytes) VALUES (?, ?, ?, ?)", (ts, iface, rx, tx))
-    con.commit()
-    con.close()
-    return ts, rx, tx
+    ts = time.time_ns() // 1_000_000_000
+    return ts, iface, rx, tx
+
+def _rebuild_deltas(con: sqlite3.Connection, iface: str, from_ts: int):
+    # from_ts ve sonrasındaki örneklerin deltaları bir önceki örnekten yeniden hesaplanır
+    # (aynı saniyedeki örnekler ekleniş sırasına, yani rowid'e göre sıralanır)
+    con.execute("""
+        UPDATE samples SET
+            rx_delta = MAX(rx_bytes - COALESCE((SELECT p.rx_bytes FROM samples p
+                WHERE p.iface = samples.iface AND (p.ts, p.rowid) < (samples.ts, samples.rowid)
+                ORDER BY p.ts DESC, p.rowid DESC LIMIT 1), rx_bytes), 0),
+            tx_delta = MAX(tx_bytes - COALESCE((SELECT p.tx_bytes FROM samples p
+                WHERE p.iface = samples.iface AND (p.ts, p.rowid) < (samples.ts, samples.rowid)
+                ORDER BY p.ts DESC, p.rowid DESC LIMIT 1), tx_bytes), 0)
+        WHERE iface = ? AND ts >= ?
+    """, (iface, from_ts))
 
-def compute_usage_between(start_ts: int, end_ts: int, iface: str, db_path: str = DB_PATH_DEFAULT):
+def _rebuild_rollup(con: sqlite3.Connection, iface: str, from_ts: int):
+    # from_ts'nin saatinden itibaren usage_hourly örnek deltalarından yeniden hesaplanır
+    hour_ts = from_ts // 3600 * 3600
+    con.execute("DELETE FROM usage_hourly WHERE iface = ? AND hour_ts >= ?", (iface, hour_ts))
+    con.execute("""
+        INSERT INTO usage_hourly (iface, hour_ts, rx, tx)
+        SELECT iface, ts / 3600 * 3600, SUM(rx_delta), SUM(tx_delta) FROM samples
+        WHERE iface = ? AND ts >= ?
+        GROUP BY ts / 3600
+    """, (iface, hour_ts))
+
+def _write_row(con: sqlite3.Connection, row: Tuple[int, str, int, int]):
+    ts, iface, rx, tx = row
+    prev = con.execute(
+        "SELECT ts, rx_bytes, tx_bytes FROM samples WHERE iface = ? ORDER BY ts DESC, rowid DESC LIMIT 1",
+        (iface,),
+    ).fetchone()
+    if prev is not None and ts < prev[0]:
+        # Sıra dışı örnek: sonraki örneklerin deltaları ve etkilenen saatler baştan hesaplanır
+        con.execute("INSERT INTO samples (ts, iface, rx_bytes, tx_bytes) VALUES (?, ?, ?, ?)", row)
+        _rebuild_deltas(con, iface, ts)
+        _rebuild_rollup(con, iface, ts)
+        return
+    rx_delta = tx_delta = 0
+    if prev is not None:
+        rx_delta = max(rx - prev[1], 0)
+        tx_delta = max(tx - prev[2], 0)
+    con.execute("""
+        INSERT INTO samples (ts, iface, rx_bytes, tx_bytes, rx_delta, tx_delta)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (ts, iface, rx, tx, rx_delta, tx_delta))
+    con.execute("""
+        INSERT INTO usage_hourly (iface, hour_ts, rx, tx) VALUES (?, ?, ?, ?)
+        ON CONFLICT (iface, hour_ts) DO UPDATE SET rx = rx + excluded.rx, tx = tx + excluded.tx
+    """, (iface, ts // 3600 * 3600, rx_delta, tx_delta))
+
+def insert_samples_bulk(rows: list[Tuple[int, str, int, int]], db_path: DbPath = DB_PATH_DEFAULT):
     ensure_db(db_path)
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
+    con = _get_conn(db_path)
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        con.executemany("INSERT INTO samples (ts, iface, rx_bytes, tx_bytes) VALUES (?, ?, ?, ?)", rows)
+        first_ts: dict[str, int] = {}
+        for ts, iface, _, _ in rows:
+            if ts < first_ts.get(iface, ts + 1):
+                first_ts[iface] = ts
+        for iface, ts in first_ts.items():
+            _rebuild_deltas(con, iface, ts)
+            _rebuild_rollup(con, iface, ts)
+        con.execute("COMMIT")
+    finally:
+        # COMMIT'e ulaşılmadıysa (KeyboardInterrupt/SystemExit dahil) işlem geri alınır
+        if con.in_transaction:
+            con.execute("ROLLBACK")
+
+def insert_sample(iface: str, db_path: DbPath = DB_PATH_DEFAULT):
+    row = _read_and_row(iface)
+    ensure_db(db_path)
+    con = _get_conn(db_path)
+    # Tek örnek: delta ve saatlik toplam artımlı yazılır (_write_row sıra dışı örneği de ele alır)
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        _write_row(con, row)
+        con.execute("COMMIT")
+    finally:
+        if con.in_transaction:
+            con.execute("ROLLBACK")
+    ts, _, rx, tx = row
+    return ts, rx, tx
+
+def _usage_from_samples(cur: sqlite3.Cursor, iface: str, start_ts: int, end_ts: int) -> Tuple[int, int]:
+    # Yarı açık [start_ts, end_ts): sınırdaki bir örneğin deltası bitişik iki aralıkta birden sayılmaz
     cur.execute("""
-        SELECT ts, rx_bytes, tx_bytes FROM samples
-        WHERE iface = ? AND ts BETWEEN ? AND ?
-        ORDER BY ts ASC
+        SELECT SUM(rx_delta), SUM(tx_delta) FROM samples
+        WHERE iface = ? AND ts >= ? AND ts < ?
     """, (iface, start_ts, end_ts))
-    rows = cur.fetchall()
-    con.close()
-    if not rows or len(rows) < 2:
-        return 0, 0
-    total_rx = 0
-    total_tx = 0
-    prev_rx = rows[0][1]
-    prev_tx = rows[0][2]
-    for _, rx, tx in rows[1:]:
-        dr = rx - prev_rx
-        dt = tx - prev_tx
-        if dr < 0: dr = 0
-        if dt < 0: dt = 0
-        total_rx += dr
-        total_tx += dt
-        prev_rx = rx
-        prev_tx = tx
-    return total_rx, total_tx
+    total_rx, total_tx = cur.fetchone()
+    return total_rx or 0, total_tx or 0
+
+def compute_usage_between(start_ts: int, end_ts: int, iface: str, db_path: DbPath = DB_PATH_DEFAULT):
+    ensure_db(db_path)
+    cur = _get_conn(db_path).cursor()
+    hour_start = -(-start_ts // 3600) * 3600
+    hour_end = end_ts // 3600 * 3600
+    if hour_end <= hour_start:
+        return _usage_from_samples(cur, iface, start_ts, end_ts)
+    # Tam saatler usage_hourly'den, baştaki/sondaki kısmi saatler örnek deltalarından
+    cur.execute("""
+        SELECT SUM(rx), SUM(tx) FROM usage_hourly
+        WHERE iface = ? AND hour_ts >= ? AND hour_ts < ?
+    """, (iface, hour_start, hour_end))
+    total_rx, total_tx = cur.fetchone()
+    total_rx = total_rx or 0
+    total_tx = total_tx or 0
+    if start_ts < hour_start:
+        rx, tx = _usage_from_samples(cur, iface, start_ts, hour_start)
+        total_rx += rx
+        total_tx += tx
+    rx, tx = _usage_from_samples(cur, iface, hour_end, end_ts)
+    return total_rx + rx, total_tx + tx
+
+BYTE_UNITS = ("B", "KB", "MB", "GB", "TB", "PB")
 
 def humanize_bytes(n: int) -> str:
-    for unit in ["B","KB","MB","GB","TB"]:
-        if n < 1024.0:
-            return f"{n:.2f} {unit}"
-        n /= 1024.0
-    return f"{n:.2f} PB"
+    # Birim, bölme döngüsü yerine bit uzunluğundan bulunur (her birim 2**10)
+    unit_idx = min((n.bit_length() - 1) // 10, 5) if n > 0 else 0
+    return f"{n / (1 << (unit_idx * 10)):.2f} {BYTE_UNITS[unit_idx]}"
 
 def day_bounds(date_str: str, tz: Optional[str] = None):
     tzinfo = None
@@ -194,15 +451,26 @@ def day_bounds(date_str: str, tz: Optional[str] = None):
     end = int((d + dt.timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
     return start, end
 
-def hourly_buckets_for_day(date_str: str, iface: str, db_path: str = DB_PATH_DEFAULT, tz: Optional[str] = None):
+def compute_hourly_buckets(date_str: str, iface: str, db_path: DbPath = DB_PATH_DEFAULT, tz: Optional[str] = None):
     start, end = day_bounds(date_str, tz)
-    buckets = []
-    for h in range(24):
-        s = start + h*3600
-        e = min(s + 3600, end)
-        rx, tx = compute_usage_between(s, e, iface, db_path)
-        buckets.append((h, rx, tx))
-    return buckets
+    ensure_db(db_path)
+    cur = _get_conn(db_path).cursor()
+    rx_buckets = [0] * 24
+    tx_buckets = [0] * 24
+    # Günün tamamı tek sorguda; her örneğin deltası kendi saatine yazılır
+    cur.execute("""
+        SELECT (ts - ?) / 3600 AS h, SUM(rx_delta), SUM(tx_delta) FROM samples
+        WHERE iface = ? AND ts >= ? AND ts < ?
+        GROUP BY h
+    """, (start, iface, start, end))
+    for h, rx, tx in cur:
+        if h < 24:
+            rx_buckets[h] = rx
+            tx_buckets[h] = tx
+    return [(h, rx_buckets[h], tx_buckets[h]) for h in range(24)]
+
+def hourly_buckets_for_day(date_str: str, iface: str, db_path: DbPath = DB_PATH_DEFAULT, tz: Optional[str] = None):
+    return compute_hourly_buckets(date_str, iface, db_path, tz)
 
 def parse_iso(s: str) -> int:
     try:
@@ -230,40 +498,110 @@ def parse_duration(s: str) -> int:
 def cmd_sample(args):
     iface = args.iface or detect_default_iface()
     ts, rx, tx = insert_sample(iface, args.db)
-    print(f"[sample] {iface} @ {dt.datetime.fromtimestamp(ts).isoformat()} rx={rx} tx={tx}")
+    print(f"[sample] {iface} @ {time.strftime(LOG_TS_FORMAT, time.localtime(ts))} rx={rx} tx={tx}")
 
 def cmd_watch(args):
     iface = args.iface or detect_default_iface()
     interval = args.interval
+    commit_every = max(1, args.commit_every)
     print(f"[watch] iface={iface} interval={interval}s veritabanı={args.db}")
-    def handler(signum, frame):
+    ensure_db(args.db)
+    # Örnekler bellekte biriktirilir ve commit_every örnekte bir tek işlemde (tek fsync) yazılır;
+    # yazma kilidi yalnızca bu kısa işlem süresince tutulur, diğer süreçler (report --update) beklemez
+    con = _get_conn(args.db)
+    pending: list[Tuple[int, str, int, int]] = []
+    flushing = False
+    stop_requested = False
+    def flush():
+        nonlocal flushing
+        if not pending:
+            return
+        # Yazım sırasında gelen sinyal işlemi yarıda kesmez; çıkış flush bitince yapılır
+        flushing = True
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                for row in pending:
+                    _write_row(con, row)
+                con.execute("COMMIT")
+            finally:
+                # COMMIT'e ulaşılmadıysa (KeyboardInterrupt/SystemExit dahil) işlem geri alınır
+                if con.in_transaction:
+                    con.execute("ROLLBACK")
+            pending.clear()
+        finally:
+            flushing = False
+    atexit.register(flush)
+    def stop():
         print("\n[watch] Çıkılıyor...")
         sys.exit(0)
+    def handler(signum, frame):
+        nonlocal stop_requested
+        if flushing:
+            stop_requested = True
+            return
+        stop()
     signal.signal(signal.SIGINT, handler)
     signal.signal(signal.SIGTERM, handler)
-    ensure_db(args.db)
     while True:
         try:
-            ts, rx, tx = insert_sample(iface, args.db)
-            print(f"[sample] {iface} @ {dt.datetime.fromtimestamp(ts).isoformat()} rx={rx} tx={tx}")
+            row = _read_and_row(iface)
+            pending.append(row)
+            if len(pending) >= commit_every:
+                flush()
+            ts, _, rx, tx = row
+            print(f"[sample] {iface} @ {time.strftime(LOG_TS_FORMAT, time.localtime(ts))} rx={rx} tx={tx}")
         except Exception as e:
             print(f"[hata] {e}", file=sys.stderr)
+        if stop_requested:
+            stop()
         time.sleep(interval)
 
+def cmd_import(args):
+    # CSV satırları: ts,iface,rx_bytes,tx_bytes (ts Unix saniye); başlık satırı varsa atlanır
+    rows = []
+    with open(args.csv, newline="") as f:
+        for lineno, rec in enumerate(csv.reader(f), 1):
+            if not rec or rec[0].startswith("#"):
+                continue
+            try:
+                rows.append((int(rec[0]), rec[1].strip(), int(rec[2]), int(rec[3])))
+            except (ValueError, IndexError):
+                if lineno == 1:
+                    continue
+                raise SystemExit(f"{args.csv}:{lineno}: geçersiz satır (beklenen: ts,iface,rx_bytes,tx_bytes)")
+    insert_samples_bulk(rows, args.db)
+    print(f"[import] {len(rows)} örnek eklendi ({args.db})")
+
 def print_usage_result(title: str, rx: int, tx: int):
     print(f"[rapor] {title}")
     print(f"  İndirilen: {humanize_bytes(rx)}")
     print(f"  Yüklenen: {humanize_bytes(tx)}")
 
-def cmd_report(args):
-    iface = args.iface or detect_default_iface()
-    if args.update:
-        insert_sample(iface, args.db)
-    picks = sum(bool(x) for x in [args.day, args.range_from and args.range_to, args.last, args.since])
-    if picks != 1:
-        raise SystemExit("Lütfen şunlardan yalnızca birini kullanın: --day YA DA (--from & --to) YA DA --last YA DA --since")
-    if args.since:
-        end_ts = int(time.time())
+def _resolve_range(args) -> Tuple[int, int, str]:
+    too_many = "Lütfen şunlardan yalnızca birini kullanın: --day YA DA (--from & --to) YA DA --last YA DA --since"
+    has_range = bool(args.range_from and args.range_to)
+    if args.day:
+        if has_range or args.last or args.since:
+            raise SystemExit(too_many)
+        start_ts, end_ts = day_bounds(args.day, args.tz)
+        return start_ts, end_ts, args.day
+    elif has_range:
+        if args.last or args.since:
+            raise SystemExit(too_many)
+        start_ts = parse_iso(args.range_from)
+        end_ts = parse_iso(args.range_to)
+        if end_ts <= start_ts:
+            raise SystemExit("--from, --to'dan önce olmalı")
+        return start_ts, end_ts, f"{args.range_from} .. {args.range_to}"
+    elif args.last:
+        if args.since:
+            raise SystemExit(too_many)
+        now = int(time.time())
+        # Bitiş hariç tutulduğundan +1: bu saniyede alınan (--update) örnek de sayılır
+        return now - parse_duration(args.last), now + 1, f"son {args.last}"
+    elif args.since:
+        now = int(time.time())
         # --since parametresi gün (YYYY-MM-DD) veya tarih-saat (ISO8601) formatında olabilir
         since_str = args.since.strip()
         if 'T' not in since_str and len(since_str) == 10:
@@ -272,47 +610,42 @@ def cmd_report(args):
         else:
             # ISO8601 formatında (tarih-saat ile), direkt parse et
             start_ts = parse_iso(since_str)
-        rx, tx = compute_usage_between(start_ts, end_ts, iface, args.db)
         start_dt = dt.datetime.fromtimestamp(start_ts).isoformat()
-        end_dt = dt.datetime.fromtimestamp(end_ts).isoformat()
-        print_usage_result(f"{start_dt} .. {end_dt} ({iface})", rx, tx)
-        return
-    if args.day:
-        start_ts, end_ts = day_bounds(args.day, args.tz)
-        rx, tx = compute_usage_between(start_ts, end_ts, iface, args.db)
-        print_usage_result(f"{args.day} ({iface})", rx, tx)
-        if args.hourly:
-            print("\nSaatlik dağılım:")
-            buckets = hourly_buckets_for_day(args.day, iface, args.db, args.tz)
-            for h, brx, btx in buckets:
-                print(f"  {h:02d}:00 - {h+1:02d}:00  ↓ {humanize_bytes(brx)}  ↑ {humanize_bytes(btx)}")
-        return
-    if args.range_from and args.range_to:
-        start_ts = parse_iso(args.range_from)
-        end_ts = parse_iso(args.range_to)
-        if end_ts <= start_ts:
-            raise SystemExit("--from, --to'dan önce olmalı")
-        rx, tx = compute_usage_between(start_ts, end_ts, iface, args.db)
-        print_usage_result(f"{args.range_from} .. {args.range_to} ({iface})", rx, tx)
-        return
-    if args.last:
-        seconds = parse_duration(args.last)
-        end_ts = int(time.time())
-        start_ts = end_ts - seconds
-        rx, tx = compute_usage_between(start_ts, end_ts, iface, args.db)
-        print_usage_result(f"son {args.last} ({iface})", rx, tx)
-        return
+        end_dt = dt.datetime.fromtimestamp(now).isoformat()
+        return start_ts, now + 1, f"{start_dt} .. {end_dt}"
+    raise SystemExit("Rapor aralığı gerekli: --day YA DA (--from & --to) YA DA --last YA DA --since")
+
+def cmd_report(args):
+    iface = args.iface or detect_default_iface()
+    if args.update:
+        insert_sample(iface, args.db)
+    if args.fast:
+        # Yalnızca rapor yolunda; --update örneği ve şema kurulumu NORMAL ile yazıldıktan sonra
+        ensure_db(args.db)
+        _get_conn(args.db).execute("PRAGMA synchronous=OFF")
+    start_ts, end_ts, title = _resolve_range(args)
+    rx, tx = compute_usage_between(start_ts, end_ts, iface, args.db)
+    print_usage_result(f"{title} ({iface})", rx, tx)
+    if args.day and args.hourly:
+        print("\nSaatlik dağılım:")
+        buckets = hourly_buckets_for_day(args.day, iface, args.db, args.tz)
+        for h, brx, btx in buckets:
+            print(f"  {h:02d}:00 - {h+1:02d}:00  ↓ {humanize_bytes(brx)}  ↑ {humanize_bytes(btx)}")
 
 def build_parser():
     p = argparse.ArgumentParser(description="macOS ağ veri kullanımı kaydedici ve raporlama (CLI)")
-    p.add_argument("--db", default=DB_PATH_DEFAULT, help=f"SQLite veritabanı yolu (vars: {DB_PATH_DEFAULT})")
+    p.add_argument("--db", type=pathlib.Path, default=DB_PATH_DEFAULT, help=f"SQLite veritabanı yolu (vars: {DB_PATH_DEFAULT})")
     p.add_argument("--iface", help="İzlenecek arayüz (ör: en0). Boşsa otomatik tespit edilir.")
     sub = p.add_subparsers(dest="cmd", required=True)
     sp = sub.add_parser("sample", help="Tek seferlik örnek al")
     sp.set_defaults(func=cmd_sample)
     sw = sub.add_parser("watch", help="Belirli aralıklarla sürekli örnek al")
     sw.add_argument("--interval", type=int, default=60, help="Örnekleme aralığı sn (vars: 60)")
+    sw.add_argument("--commit-every", type=int, default=10, help="Kaç örnekte bir diske yazılsın (vars: 10)")
     sw.set_defaults(func=cmd_watch)
+    si = sub.add_parser("import", help="CSV dosyasından toplu örnek içe aktar (ts,iface,rx_bytes,tx_bytes)")
+    si.add_argument("csv", help="İçe aktarılacak CSV dosyası")
+    si.set_defaults(func=cmd_import)
     sr = sub.add_parser("report", help="Rapor üret")
     sr.add_argument("--day", help="Günlük rapor tarihi (YYYY-MM-DD)")
     sr.add_argument("--hourly", action="store_true", help="Günlük raporu saatlik kırılımda da göster")
@@ -322,6 +655,7 @@ def build_parser():
     sr.add_argument("--since", help="Belirli bir tarihten bugüne kadar (YYYY-MM-DD veya ISO8601 tarih-saat, ör: 2025-11-01 veya 2025-11-02T18:30:00)")
     sr.add_argument("--tz", help="Gün sınırları için saat dilimi (örn: Europe/Istanbul). Boşsa yerel saat.")
     sr.add_argument("--update", action="store_true", help="Raporlamadan hemen önce bir sample al")
+    sr.add_argument("--fast", action="store_true", help="Rapor bağlantısında SQLite synchronous=OFF (--update örneği yine güvenle yazılır)")
     sr.set_defaults(func=cmd_report)
     return p
 